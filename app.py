@@ -1,10 +1,24 @@
 import streamlit as st
 import pandas as pd
 import json
+import math
+import numpy as np
 import pydeck as pdk
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from data_sources import fetch_usgs_quakes, fetch_gdacs_events, fetch_nasa_firms
-from utils import geocode, haversine_km
+from utils import geocode, haversine_km_vec
+
+# Streamlit reruns the whole script on every widget change; cache the network
+# calls so only a TTL expiry (or a new hours_back/query) goes back to the wire.
+# Feed TTLs are set in data_sources.py next to the on-disk cache, which shares
+# each feed's staleness budget with this layer.
+fetch_usgs_quakes = st.cache_data(ttl=fetch_usgs_quakes.memory_ttl, show_spinner=False)(fetch_usgs_quakes)
+fetch_gdacs_events = st.cache_data(ttl=fetch_gdacs_events.memory_ttl, show_spinner=False)(fetch_gdacs_events)
+fetch_nasa_firms = st.cache_data(ttl=fetch_nasa_firms.memory_ttl, show_spinner=False)(fetch_nasa_firms)
+geocode = st.cache_data(ttl=86400, show_spinner=False)(geocode)
 
 st.set_page_config(page_title="HADRI – Disaster Intelligence", layout="wide")
 st.title("HADRI – Disaster Intelligence (Starter App)")
@@ -31,32 +45,47 @@ with col3:
 
 # --- Fetch data
 with st.spinner("Fetching hazard feeds…"):
-    try:
-        quakes = fetch_usgs_quakes(hours_back=hours_back)
-    except Exception as e:
-        st.warning(f"USGS fetch failed: {e}")
-        quakes = pd.DataFrame()
-
-    try:
-        gdacs = fetch_gdacs_events(hours_back=hours_back)
-    except Exception as e:
-        st.warning(f"GDACS fetch failed: {e}")
-        gdacs = pd.DataFrame()
-
-    try:
-        fires = fetch_nasa_firms(hours_back=hours_back)
-    except Exception as e:
-        st.warning(f"NASA FIRMS fetch failed: {e}")
-        fires = pd.DataFrame()
+    # Independent hosts, so fetch concurrently; warnings stay on the script thread.
+    # Workers inherit the script's run context, without which st.cache_data
+    # neither reads nor writes and every rerun would refetch.
+    ctx = get_script_run_ctx()
+    feeds = {
+        "quakes": ("USGS", fetch_usgs_quakes),
+        "gdacs": ("GDACS", fetch_gdacs_events),
+        "fires": ("NASA FIRMS", fetch_nasa_firms),
+    }
+    results = {}
+    with ThreadPoolExecutor(
+        max_workers=len(feeds),
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx),
+    ) as ex:
+        futs = {ex.submit(fn, hours_back=hours_back): name for name, (_, fn) in feeds.items()}
+        for fut in as_completed(futs):
+            name = futs[fut]
+            try:
+                results[name] = fut.result()
+            except Exception as e:
+                st.warning(f"{feeds[name][0]} fetch failed: {e}")
+                results[name] = pd.DataFrame()
+    quakes, gdacs, fires = results["quakes"], results["gdacs"], results["fires"]
+
+FEED_PREVIEW_ROWS = 500
+
+def show_feed(df, label):
+    # Every rerun ships the table to the browser, so only send a preview by default
+    if len(df) > FEED_PREVIEW_ROWS and not st.checkbox(f"Show full {label} table ({len(df)} rows)", key=f"full_{label}"):
+        st.dataframe(df.head(FEED_PREVIEW_ROWS), use_container_width=True)
+    else:
+        st.dataframe(df, use_container_width=True)
 
 st.subheader("Live Feeds")
 tabs = st.tabs(["Earthquakes (USGS)", "All-hazards (GDACS)", "Fires (NASA FIRMS)"])
 with tabs[0]:
-    st.dataframe(quakes, use_container_width=True)
+    show_feed(quakes, "USGS")
 with tabs[1]:
-    st.dataframe(gdacs, use_container_width=True)
+    show_feed(gdacs, "GDACS")
 with tabs[2]:
-    st.dataframe(fires, use_container_width=True)
+    show_feed(fires, "FIRMS")
 
 # --- AOI Filter
 st.subheader("Area of Interest filter")
@@ -73,19 +102,26 @@ def filter_by_aoi(df, lat_col, lon_col, label):
         st.markdown(f"**{label}: 0 within {radius_km} km**")
         return pd.DataFrame()
 
-    # Clean coords
-    f = df.copy()
-    f = f.dropna(subset=[lat_col, lon_col])
-    f[lat_col] = pd.to_numeric(f[lat_col], errors="coerce")
-    f[lon_col] = pd.to_numeric(f[lon_col], errors="coerce")
-    f = f.dropna(subset=[lat_col, lon_col])
-
-    if f.empty:
-        st.markdown(f"**{label}: 0 within {radius_km} km**")
-        return pd.DataFrame()
-
-    f["distance_km"] = f.apply(lambda r: haversine_km(aoi_lat, aoi_lon, r[lat_col], r[lon_col]), axis=1)
-    f = f[f["distance_km"] <= radius_km].sort_values("distance_km")
+    # Work on plain arrays and only materialise the rows that survive
+    lat = pd.to_numeric(df[lat_col], errors="coerce").to_numpy()
+    lon = pd.to_numeric(df[lon_col], errors="coerce").to_numpy()
+
+    # Cheap bounding-box prefilter so haversine only runs on nearby candidates.
+    # The longitude half-width is the circle's true extent (widest off-centre),
+    # and wraps across the antimeridian. NaN coords fail every comparison.
+    dlat_max = radius_km / 111.0
+    sin_r = math.sin(radius_km / 6371.0)
+    cos_lat = math.cos(math.radians(aoi_lat))
+    dlon_max = math.degrees(math.asin(sin_r / cos_lat)) if sin_r < cos_lat else 180.0
+    dlon = np.abs(lon - aoi_lon)
+    mask = (np.abs(lat - aoi_lat) <= dlat_max) & ((dlon <= dlon_max) | (dlon >= 360 - dlon_max))
+    idx = np.flatnonzero(mask)
+
+    dist = haversine_km_vec(aoi_lat, aoi_lon, lat[idx], lon[idx])
+    keep = dist <= radius_km
+    idx = idx[keep]
+    f = df.iloc[idx].assign(**{lat_col: lat[idx], lon_col: lon[idx], "distance_km": dist[keep]})
+    f = f.sort_values("distance_km")
 
     st.markdown(f"**{label}: {len(f)} within {radius_km} km**")
     st.dataframe(f, use_container_width=True)
@@ -119,17 +155,14 @@ if aoi_lat is not None and aoi_lon is not None:
     layers = []
 
     # AOI ring (approx by 60 points on a circle)
-    import math
-    ring = []
     R = 6371.0
     rad = radius_km / R
-    for i in range(60):
-        bearing = math.radians(i*6)
-        lat1 = math.radians(aoi_lat); lon1 = math.radians(aoi_lon)
-        lat2 = math.asin(math.sin(lat1)*math.cos(rad) + math.cos(lat1)*math.sin(rad)*math.cos(bearing))
-        lon2 = lon1 + math.atan2(math.sin(bearing)*math.sin(rad)*math.cos(lat1),
-                                 math.cos(rad)-math.sin(lat1)*math.sin(lat2))
-        ring.append([math.degrees(lon2), math.degrees(lat2)])
+    bearing = np.radians(np.arange(60) * 6)
+    lat1 = np.radians(aoi_lat); lon1 = np.radians(aoi_lon)
+    lat2 = np.arcsin(np.sin(lat1)*np.cos(rad) + np.cos(lat1)*np.sin(rad)*np.cos(bearing))
+    lon2 = lon1 + np.arctan2(np.sin(bearing)*np.sin(rad)*np.cos(lat1),
+                             np.cos(rad)-np.sin(lat1)*np.sin(lat2))
+    ring = np.column_stack([np.degrees(lon2), np.degrees(lat2)]).tolist()
 
     layers.append(pdk.Layer(
         "PolygonLayer",
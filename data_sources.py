@@ -1,12 +1,70 @@
+import functools
+import os
+import time
+import numpy as np
 import pandas as pd
-import requests
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pac
 from datetime import datetime, timedelta, timezone
-from xml.etree import ElementTree as ET
-from io import StringIO
+from io import BytesIO
+from lxml import etree
+from utils import make_session
+
+try:
+    from orjson import loads as _loads
+except ImportError:  # optional: falls back to the stdlib decoder
+    from json import loads as _loads
+
+_SESSION = make_session()
+
+GDACS_NS = {
+    "geo": "http://www.w3.org/2003/01/geo/wgs84_pos#",
+    "dc": "http://purl.org/dc/elements/1.1/",
+}
+
+CACHE_DIR = "cache"
 
 def _now_utc():
     return datetime.now(timezone.utc)
 
+def _parquet_cached(name, ttl):
+    """Persist a fetcher's frame as zstd Parquet.
+
+    `ttl` is the feed's total staleness budget. An in-memory cache layered on
+    top (st.cache_data in app.py) can hold a frame read from a file that was
+    already nearly expired. To keep the worst case within `ttl`, the file is
+    reused for half of it, and the wrapper's `memory_ttl` gives the other half
+    to the in-memory layer.
+
+    Survives process restarts, unlike st.cache_data. Empty frames are not
+    written so a failed/blank fetch is retried on the next call.
+    """
+    disk_ttl = ttl / 2
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(hours_back=24):
+            path = os.path.join(CACHE_DIR, f"{name}_{hours_back}.parquet")
+            try:
+                if time.time() - os.path.getmtime(path) < disk_ttl:
+                    return pd.read_parquet(path)
+            except Exception:
+                pass
+            df = fn(hours_back=hours_back)
+            if not df.empty:
+                try:
+                    os.makedirs(CACHE_DIR, exist_ok=True)
+                    tmp = f"{path}.{os.getpid()}.tmp"
+                    df.to_parquet(tmp, engine="pyarrow", compression="zstd", compression_level=3, index=False)
+                    os.replace(tmp, path)
+                except Exception:
+                    pass
+            return df
+        wrapper.memory_ttl = ttl - disk_ttl
+        return wrapper
+    return decorator
+
+@_parquet_cached("usgs", ttl=60)
 def fetch_usgs_quakes(hours_back=24):
     """USGS earthquakes past N hours."""
     # Use official day/hour feeds; hours_back is applied by choosing the feed
@@ -15,61 +73,74 @@ def fetch_usgs_quakes(hours_back=24):
         if hours_back <= 1 else
         "https://earthquake.usgs.gov/earthquakes/feed/v1.0/summary/all_day.geojson"
     )
-    r = requests.get(url, timeout=20)
+    r = _SESSION.get(url, timeout=20)
     r.raise_for_status()
-    js = r.json()
-    rows = []
-    for f in js.get("features", []):
-        props = f.get("properties", {}) or {}
-        geom = f.get("geometry", {}) or {}
-        coords = geom.get("coordinates", [None, None, None])
-        rows.append({
-            "time_utc": datetime.utcfromtimestamp((props.get("time") or 0)/1000).replace(tzinfo=timezone.utc),
-            "magnitude": props.get("mag"),
-            "place": props.get("place"),
-            "latitude": coords[1],
-            "longitude": coords[0],
-            "depth_km": coords[2],
-            "url": props.get("url")
-        })
-    df = pd.DataFrame(rows)
+    js = _loads(r.content)
+    # Build columns directly rather than a list of per-row dicts
+    feats = js.get("features", [])
+    n = len(feats)
+    props = [f.get("properties") or {} for f in feats]
+    times = np.fromiter((p.get("time") or 0 for p in props), dtype="int64", count=n)
+    mags = np.array([p.get("mag") for p in props], dtype="float64")
+    coords = np.array(
+        [((f.get("geometry") or {}).get("coordinates") or [None] * 3)[:3] for f in feats],
+        dtype="float64",
+    ).reshape(n, 3)
+    df = pd.DataFrame({
+        "time_utc": pd.to_datetime(times, unit="ms", utc=True),
+        "magnitude": mags,
+        "place": [p.get("place") for p in props],
+        "latitude": coords[:, 1].astype("float32"),
+        "longitude": coords[:, 0].astype("float32"),
+        "depth_km": coords[:, 2],
+        "url": [p.get("url") for p in props],
+    })
     if not df.empty:
         df = df.sort_values("time_utc", ascending=False).reset_index(drop=True)
     return df
 
+@_parquet_cached("gdacs", ttl=600)
 def fetch_gdacs_events(hours_back=24):
     """GDACS global all-hazards via RSS."""
     url = "https://www.gdacs.org/xml/rss.xml"
-    r = requests.get(url, timeout=20)
+    r = _SESSION.get(url, timeout=20)
     r.raise_for_status()
-    root = ET.fromstring(r.content)
-    items = root.findall(".//item")
-    rows = []
+    items = etree.iterparse(BytesIO(r.content), events=("end",), tag="item")
     cutoff = _now_utc() - timedelta(hours=hours_back)
-    for it in items:
+    times, titles, links, lats, lons = [], [], [], [], []
+    for _, it in items:
         title = (it.findtext("title") or "").strip()
         link = it.findtext("link") or ""
-        pubdate = it.findtext("{http://purl.org/dc/elements/1.1/}date") or it.findtext("pubDate") or ""
-        lat = it.findtext("{http://www.w3.org/2003/01/geo/wgs84_pos#}lat")
-        lon = it.findtext("{http://www.w3.org/2003/01/geo/wgs84_pos#}long") or it.findtext("{http://www.w3.org/2003/01/geo/wgs84_pos#}lon")
+        pubdate = it.findtext("dc:date", namespaces=GDACS_NS) or it.findtext("pubDate") or ""
+        lat = it.findtext("geo:lat", namespaces=GDACS_NS)
+        lon = it.findtext("geo:long", namespaces=GDACS_NS) or it.findtext("geo:lon", namespaces=GDACS_NS)
+        # Drop parsed items as we go so the tree never holds the whole feed
+        it.clear()
+        while it.getprevious() is not None:
+            del it.getparent()[0]
         try:
             t = datetime.fromisoformat(pubdate.replace("Z","+00:00"))
         except Exception:
             t = _now_utc()
         if t < cutoff:
             continue
-        rows.append({
-            "time_utc": t,
-            "title": title,
-            "url": link,
-            "latitude": float(lat) if lat else None,
-            "longitude": float(lon) if lon else None,
-        })
-    df = pd.DataFrame(rows)
+        times.append(t)
+        titles.append(title)
+        links.append(link)
+        lats.append(float(lat) if lat else np.nan)
+        lons.append(float(lon) if lon else np.nan)
+    df = pd.DataFrame({
+        "time_utc": pd.to_datetime(times, utc=True),
+        "title": titles,
+        "url": links,
+        "latitude": np.array(lats, dtype="float64"),
+        "longitude": np.array(lons, dtype="float64"),
+    })
     if not df.empty:
         df = df.sort_values("time_utc", ascending=False).reset_index(drop=True)
     return df
 
+@_parquet_cached("firms", ttl=900)
 def fetch_nasa_firms(hours_back=24):
     """NASA FIRMS global fires (VIIRS NRT, last 24h) with header + fallback."""
     primary = "https://firms.modaps.eosdis.nasa.gov/data/active_fire/viirs-nrt/viirs_global_24h.csv"
@@ -78,40 +149,50 @@ def fetch_nasa_firms(hours_back=24):
         "https://firms.modaps.eosdis.nasa.gov/data/active_fire/viirs/viirs_global_24h.csv",
         "https://firms.modaps.eosdis.nasa.gov/data/active_fire/viirs-nrt/VIIRS_I_Global_24h.csv",
     ]
-    headers = {"User-Agent": "HADRI-Disaster-Intel/1.0"}
 
     def try_read(url):
-        r = requests.get(url, headers=headers, timeout=30)
-        r.raise_for_status()
-        return pd.read_csv(StringIO(r.text))
+        # Multithreaded Arrow parse straight off the (gunzipped) socket
+        with _SESSION.get(url, timeout=30, stream=True) as r:
+            r.raise_for_status()
+            r.raw.decode_content = True
+            return pac.read_csv(
+                r.raw,
+                read_options=pac.ReadOptions(use_threads=True),
+                convert_options=pac.ConvertOptions(
+                    include_columns=["latitude", "longitude", "bright_ti4", "confidence", "acq_date", "acq_time"],
+                    column_types={
+                        "latitude": pa.float32(),
+                        "longitude": pa.float32(),
+                        "bright_ti4": pa.float32(),
+                        "acq_date": pa.date32(),
+                        "acq_time": pa.int32(),
+                    },
+                ),
+            )
 
-    df = None
+    tbl = None
     try:
-        df = try_read(primary)
+        tbl = try_read(primary)
     except Exception:
         for u in fallbacks:
             try:
-                df = try_read(u)
+                tbl = try_read(u)
                 break
             except Exception:
                 continue
-    if df is None or df.empty:
+    if tbl is None or tbl.num_rows == 0:
         return pd.DataFrame(columns=["time_utc","latitude","longitude","brightness","confidence"])
 
-    # Build a datetime column (UTC)
-    try:
-        dt = pd.to_datetime(
-            df["acq_date"] + " " + df["acq_time"].astype(str).str.zfill(4),
-            format="%Y-%m-%d %H%M",
-            utc=True
-        )
-        df["time_utc"] = dt
-    except Exception:
-        df["time_utc"] = pd.NaT
-
+    # acq_time is HHMM as an int; build the UTC timestamp and apply the cutoff
+    # in Arrow so only in-window rows are converted to pandas
+    at = tbl["acq_time"]
+    hh = pc.divide(at, 100)
+    mm = pc.subtract(at, pc.multiply(hh, 100))
+    secs = pc.cast(pc.multiply(pc.add(pc.multiply(hh, 60), mm), 60), pa.int64())
+    ts = pc.add(pc.cast(tbl["acq_date"], pa.timestamp("s", tz="UTC")), pc.cast(secs, pa.duration("s")))
     cutoff = datetime.now(timezone.utc) - timedelta(hours=hours_back)
-    if "time_utc" in df:
-        df = df[df["time_utc"] >= cutoff]
+    mask = pc.greater_equal(ts, pa.scalar(int(cutoff.timestamp()), type=pa.timestamp("s", tz="UTC")))
+    df = tbl.append_column("time_utc", ts).filter(mask).to_pandas()
 
     out = df.rename(columns={
         "latitude": "latitude",
@@ -119,6 +200,5 @@ def fetch_nasa_firms(hours_back=24):
         "bright_ti4": "brightness",
         "confidence": "confidence"
     })[["time_utc", "latitude", "longitude", "brightness", "confidence"]]
-
-    return out.sort_values("time_utc", ascending=False).reset_index(drop=True)
+    out.sort_values("time_utc", ascending=False, inplace=True, ignore_index=True)
     return out
@@ -1,18 +1,78 @@
 
+import functools
 import math
+import sqlite3
+import threading
+import time
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+try:
+    import numba
+except ImportError:  # optional: falls back to plain NumPy
+    numba = None
+
+def make_session():
+    """Pooled keep-alive HTTP session with light retries on gateway errors."""
+    s = requests.Session()
+    s.headers.update({"User-Agent": "HADRI-Disaster-Intel/1.0", "Accept-Encoding": "gzip, deflate"})
+    retry = Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retry)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+# Nominatim asks for an identifying User-Agent; make_session() bakes it in
+_GEO_SESSION = make_session()
+
+# Persistent geocode cache: survives restarts and is shared by every session
+GEOCODE_TTL_S = 30 * 86400
+_GEO_DB = None
+_GEO_DB_LOCK = threading.Lock()
+
+def _geo_db():
+    """Open the cache on first use (call with _GEO_DB_LOCK held)."""
+    global _GEO_DB
+    if _GEO_DB is None:
+        db = sqlite3.connect("geocode_cache.db", check_same_thread=False)
+        db.execute("CREATE TABLE IF NOT EXISTS geo(q TEXT PRIMARY KEY, lat REAL, lon REAL, ts INTEGER)")
+        _GEO_DB = db
+    return _GEO_DB
+
+@functools.lru_cache(maxsize=2048)
 def geocode(query: str):
-    """Return (lat, lon) via Nominatim (OpenStreetMap)."""
+    """Return (lat, lon) via Nominatim (OpenStreetMap), cached on disk."""
+    now = int(time.time())
+    # The disk cache is best-effort: any SQLite failure falls through to the network
+    row = None
+    try:
+        with _GEO_DB_LOCK:
+            row = _geo_db().execute(
+                "SELECT lat, lon FROM geo WHERE q=? AND ts>?", (query, now - GEOCODE_TTL_S)
+            ).fetchone()
+    except sqlite3.Error:
+        pass
+    if row:
+        return row[0], row[1]
+
     url = "https://nominatim.openstreetmap.org/search"
     params = {"q": query, "format": "json", "limit": 1}
-    headers = {"User-Agent": "HADRI-Disaster-Intel/1.0"}
-    r = requests.get(url, params=params, headers=headers, timeout=20)
+    r = _GEO_SESSION.get(url, params=params, timeout=10)
     r.raise_for_status()
     js = r.json()
     if not js:
         raise ValueError("No results")
-    return float(js[0]["lat"]), float(js[0]["lon"])
+    lat, lon = float(js[0]["lat"]), float(js[0]["lon"])
+    try:
+        with _GEO_DB_LOCK:
+            db = _geo_db()
+            with db:
+                db.execute("INSERT OR REPLACE INTO geo VALUES (?, ?, ?, ?)", (query, lat, lon, now))
+    except sqlite3.Error:
+        pass
+    return lat, lon
 
 def haversine_km(lat1, lon1, lat2, lon2):
     """Great-circle distance between two WGS84 points in km."""
@@ -22,5 +82,42 @@ def haversine_km(lat1, lon1, lat2, lon2):
     phi1, phi2 = math.radians(lat1), math.radians(lat2)
     dphi = math.radians(lat2 - lat1)
     dlambda = math.radians(lon2 - lon1)
-    a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dlambda/2)**2
-    return 2 * R * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    a = math.sin(0.5*dphi)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(0.5*dlambda)**2
+    # asin form: one sqrt + asin instead of two sqrts + atan2; clamp guards rounding at
+    # antipodes (a first so NaN propagates, matching the array kernels)
+    return 2 * R * math.asin(math.sqrt(min(a, 1.0)))
+
+if numba is not None:
+    # Serial on purpose: Streamlit calls this from one thread per session, and
+    # numba's fallback workqueue threading layer aborts on concurrent use.
+    @numba.njit(fastmath=True, cache=True)
+    def _haversine_nb(lat0, lon0, lats, lons, out):
+        R = 6371.0
+        phi1 = math.radians(lat0)
+        cos_phi1 = math.cos(phi1)
+        for i in range(len(lats)):
+            # Straight-line body (no branches) so the loop vectorises under fastmath
+            phi2 = math.radians(lats[i])
+            a = math.sin(0.5*(phi2 - phi1))**2
+            a += cos_phi1*math.cos(phi2)*math.sin(0.5*math.radians(lons[i] - lon0))**2
+            out[i] = (2*R) * math.asin(math.sqrt(min(a, 1.0)))
+        return out
+
+def haversine_km_vec(lat0, lon0, lats, lons):
+    """Great-circle distance in km from one point to arrays of points.
+
+    float32 inputs are computed (and returned) in float32.
+    """
+    lats, lons = np.asarray(lats), np.asarray(lons)
+    dtype = np.result_type(lats, lons, np.float32)
+    lats, lons = lats.astype(dtype, copy=False), lons.astype(dtype, copy=False)
+    if numba is not None:
+        return _haversine_nb(dtype.type(lat0), dtype.type(lon0), lats, lons, np.empty_like(lats))
+    R = dtype.type(6371.0)
+    lat0, lon0 = dtype.type(lat0), dtype.type(lon0)
+    phi1, phi2 = np.radians(lat0), np.radians(lats)
+    # NaNs propagate through the ufuncs, so no per-point guard is needed
+    a = np.sin(0.5*(phi2 - phi1))**2
+    a += np.cos(phi1)*np.cos(phi2)*np.sin(0.5*np.radians(lons - lon0))**2
+    np.minimum(a, 1, out=a)
+    return (2*R) * np.arcsin(np.sqrt(a, out=a), out=a)